@@ -4,19 +4,130 @@ your Github gists.
 """
 
 import argparse
-from collections import namedtuple
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import date
+from hashlib import sha256
+from json import dumps
+import os
 from os import environ
-from time import sleep
+from pathlib import Path
+from threading import Lock
+from time import sleep, time
+from typing import FrozenSet, Optional, Tuple
 
 from alive_progress import alive_bar
 import requests
+from requests.adapters import HTTPAdapter
 import rich
+from urllib3.util.retry import Retry
 
-Gist = namedtuple(
-    "Gist",
-    ["id", "visibility", "language", "created_date"],
-)
+try:
+    from orjson import loads
+except ImportError:  # orjson is an optional, faster JSON parser.
+    from json import loads
+
+# Number of delete requests in flight at once. Kept small to stay well under
+# Github's secondary rate limit on concurrent requests.
+MAX_CONCURRENT_DELETES = 8
+
+# Github asks for at least a second between requests that change data, and
+# limits them to about 80 a minute.
+SECONDS_BETWEEN_DELETES = 1
+
+# Answers to the confirmation prompt that go ahead with the deletion.
+CONFIRMATION_ANSWERS = frozenset({"y", "yes"})
+
+# Times to retry a request that hit a rate limit before giving up.
+MAX_RATE_LIMIT_RETRIES = 3
+
+# Seconds to wait after hitting a secondary rate limit that doesn't say how
+# long to wait for, as recommended by Github.
+SECONDARY_RATE_LIMIT_WAIT = 60
+
+# Wait for the rate limit to reset once fewer requests than this remain.
+RATE_LIMIT_LOW_WATERMARK = 10
+
+# Pages of gists from the REST API, kept so unchanged pages can be reused.
+# Only used when listing falls back to the REST API, as the GraphQL API has
+# no conditional requests. Holds the ids of secret gists, so it's private to
+# the user, with one file per token.
+CACHE_DIR = Path(environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "gists-gone"
+
+# Only fetch the fields the tool actually filters on.
+GRAPHQL_GISTS_QUERY = """
+query($cursor: String) {
+  viewer {
+    gists(first: 100, after: $cursor, privacy: ALL) {
+      nodes {
+        name
+        isPublic
+        createdAt
+        files {
+          name
+          language {
+            name
+          }
+        }
+      }
+      pageInfo {
+        endCursor
+        hasNextPage
+      }
+    }
+  }
+}
+"""
+
+
+@dataclass(frozen=True)
+class Gist:
+    """A Github gist, reduced to the fields the tool filters on."""
+
+    # Declared by hand as dataclass(slots=True) needs Python 3.10+.
+    __slots__ = ("id", "visibility", "language", "created_date")
+
+    id: str
+    visibility: str
+    language: str
+    created_date: date
+
+
+@dataclass(frozen=True)
+class Filter:
+    """The CLI arguments gists are filtered on. None matches every gist."""
+
+    __slots__ = ("visibility", "languages", "date_range")
+
+    visibility: Optional[str]
+    languages: Optional[FrozenSet[str]]
+    date_range: Optional[Tuple[date, date]]  # Start and end dates, inclusive.
+
+    def is_empty(self):
+        """Check whether the filter matches every gist."""
+        return (
+            self.visibility is None
+            and self.languages is None
+            and self.date_range is None
+        )
+
+
+class RateLimiter:
+    """Space out requests sent from several threads."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._lock = Lock()
+        self._next_request_time = 0
+
+    def wait(self):
+        """Wait until the next request is allowed to be sent."""
+        with self._lock:
+            now = time()
+            request_time = max(now, self._next_request_time)
+            self._next_request_time = request_time + self.interval
+        if request_time > now:
+            sleep(request_time - now)
 
 
 def get_parser_args():
@@ -31,6 +142,8 @@ def get_parser_args():
     parser.add_argument(
         "-f",
         "--force",
+        "-y",
+        "--yes",
         action="store_true",
         help="Don't ask for confirmation before deletion of gists. Use with caution.",
         required=False,
@@ -78,43 +191,236 @@ def cli():
                 "Please pass your Github API token to the --token option or create an environmental variable."
             )
 
-    relevant_args = [
-        value for key, value in vars(args).items() if key not in ("token", "force")
-    ]
-    # Process date arguments.
-    if relevant_args[2] is not None:
-        relevant_args[2] = parse_date_arguments(relevant_args[2])
+    gist_filter = create_filter(args.visibility, args.languages, args.date_range)
+
+    session = create_session(args.token)
+
+    # Verify token is valid and get all gists. They're streamed a page at a
+    # time so only the ids of the matching gists are held in memory.
+    gists = fetch_gists(session)
+
+    # Filter and delete gists.
+    if gist_filter.is_empty():
+        gist_ids = [gist.id for gist in gists]
+    else:
+        gist_ids = filter_gists(gist_filter, gists)
+    delete_gists(args, gist_ids, session)
+
+
+def get_api_headers(token):
+    """Get the headers every request to the Github API needs."""
+    return {
+        "Accept": "application/vnd.github+json",
+        "Authorization": f"Bearer {token}",
+        "X-GitHub-Api-Version": "2022-11-28",
+    }
+
+
+def create_session(token):
+    """Create a session that reuses its connection to the Github API and
+    retries transient server errors."""
+    session = requests.Session()
+    session.headers.update(get_api_headers(token))
+    retries = Retry(
+        total=5,
+        backoff_factor=0.5,
+        status_forcelist=[502, 503, 504],
+        raise_on_status=False,  # Let raise_for_status() report the error.
+        respect_retry_after_header=False,  # Rate limits are left to send_request().
+    )
+    session.mount(
+        "https://",
+        HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=MAX_CONCURRENT_DELETES,
+            max_retries=retries,
+        ),
+    )
+    return session
+
+
+def send_request(session, method, url, before_request=None, **kwargs):
+    """Send a request to the Github API, waiting out any rate limits.
+
+    before_request is called before every attempt, including retries.
+    """
+    for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+        if before_request is not None:
+            before_request()
+        response = session.request(method, url, **kwargs)
+        rate_limited = response.status_code in (403, 429) and (
+            "Retry-After" in response.headers
+            or response.headers.get("X-RateLimit-Remaining") == "0"
+            or is_secondary_rate_limited(response)
+        )
+        if rate_limited and attempt == MAX_RATE_LIMIT_RETRIES:
+            break
+        wait = get_rate_limit_wait(response)
+        if wait > 0:
+            sleep(wait)
+        if not rate_limited:
+            break
+    return response
 
-    # Verify token is valid and get all gists.
-    gists = []
+
+def get_rate_limit_wait(response):
+    """Get the number of seconds to wait before the next request to stay
+    within Github's rate limits."""
+    if "Retry-After" in response.headers:  # Secondary rate limit.
+        return int(response.headers["Retry-After"])
+    if is_secondary_rate_limited(response):
+        return SECONDARY_RATE_LIMIT_WAIT
+    remaining = response.headers.get("X-RateLimit-Remaining")
+    if remaining is not None and int(remaining) < RATE_LIMIT_LOW_WATERMARK:
+        reset = int(response.headers.get("X-RateLimit-Reset", "0"))
+        return max(0, reset - time())
+    return 0
+
+
+def is_secondary_rate_limited(response):
+    """Check whether the response is from a secondary rate limit. Github
+    doesn't always send headers with these, only an error message."""
+    return (
+        response.status_code in (403, 429)
+        and "secondary rate limit" in response.text.lower()
+    )
+
+
+def fetch_gists(session):
+    """Yield all the user's gists, falling back to the REST API if the GraphQL
+    API can't be used (e.g. older Github Enterprise Server versions)."""
+    gists = fetch_gists_graphql(session)
+    # Only fall back before any gists have been yielded, so none are repeated.
+    try:
+        first_gist = next(gists)
+    except StopIteration:
+        return
+    except (requests.RequestException, KeyError, ValueError):
+        yield from fetch_gists_rest(session)
+        return
+    yield first_gist
+    yield from gists
+
+
+def fetch_gists_graphql(session):
+    """Yield all the user's gists from the GraphQL API, a page at a time."""
+    cursor = None
+    while True:
+        response = send_request(
+            session,
+            "POST",
+            "https://api.github.com/graphql",
+            json={"query": GRAPHQL_GISTS_QUERY, "variables": {"cursor": cursor}},
+        )
+        response.raise_for_status()
+        payload = loads(response.content)
+        if payload.get("errors"):
+            raise ValueError(f"Github GraphQL API error: {payload['errors']}")
+        connection = payload["data"]["viewer"]["gists"]
+        yield from create_gists_from_graphql(connection["nodes"])
+        if not connection["pageInfo"]["hasNextPage"]:
+            break
+        cursor = connection["pageInfo"]["endCursor"]
+
+
+def fetch_gists_rest(session):
+    """Yield all the user's gists from the REST API, a page at a time.
+
+    Pages are requested with the ETag of the cached copy so that unchanged
+    pages come back as a 304 and can be read from the cache instead. This
+    cache is only used here, as the GraphQL API has no conditional requests.
+    """
+    cache_path = get_cache_path(session)
+    cached_pages = load_cache(cache_path)
+    pages = {}
     for page in range(1, 31):
-        response = requests.get(
+        cached_page = cached_pages.get(str(page))
+        headers = {"If-None-Match": cached_page["etag"]} if cached_page else {}
+        response = send_request(
+            session,
+            "GET",
             "https://api.github.com/gists",
-            headers={
-                "Accept": "application/vnd.github+json",
-                "Authorization": f"Bearer {args.token}",
-                "X-GitHub-Api-Version": "2022-11-28",
-            },
             params={"per_page": "100", "page": f"{page}"},
+            headers=headers,
         )
         response.raise_for_status()
-        page_gists = create_gists(response.json())
-        gists.extend(page_gists)
-        if len(page_gists) < 30:  # No gists on further pages.
+        if response.status_code == 304:  # Not modified.
+            raw_gists = cached_page["gists"]
+            pages[str(page)] = cached_page
+        else:
+            raw_gists = loads(response.content)
+            if "ETag" in response.headers:
+                pages[str(page)] = {
+                    "etag": response.headers["ETag"],
+                    "gists": [strip_raw_gist(raw_gist) for raw_gist in raw_gists],
+                }
+        if not raw_gists:  # The previous page was the last one.
+            break
+        yield from create_gists(raw_gists)
+        if len(raw_gists) < 100:  # No gists on further pages.
             break
-        sleep(1)  # To avoid secondary rate limits.
+    save_cache(cache_path, pages)
 
-    # Filter and delete gists.
-    if all(value is None for value in relevant_args):
-        gist_ids = [gist.id for gist in gists]
-        delete_gists(args, gist_ids)
+
+def strip_raw_gist(raw_gist):
+    """Keep only the fields of a gist from the REST API that create_gists()
+    uses, to keep the cache small."""
+    first_file_name, first_file = next(iter(raw_gist["files"].items()))
+    return {
+        "id": raw_gist.get("id"),
+        "public": raw_gist.get("public"),
+        "created_at": raw_gist["created_at"],
+        "files": {first_file_name: {"language": first_file.get("language")}},
+    }
+
+
+def get_cache_path(session):
+    """Get the path of the cache for the token the session authenticates
+    with, so different accounts never share a cache."""
+    token_hash = sha256(session.headers["Authorization"].encode("utf-8"))
+    return CACHE_DIR / f"{token_hash.hexdigest()}.json"
+
+
+def load_cache(cache_path):
+    """Load the cached pages of gists, or nothing if there is no usable
+    cache."""
+    try:
+        return loads(cache_path.read_bytes())["pages"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return {}
+
+
+def save_cache(cache_path, pages):
+    """Save the pages of gists to the cache, readable only by the user.
+    Failing to do so isn't fatal."""
+    temporary_path = cache_path.with_suffix(".tmp")
+    try:
+        cache_path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        if temporary_path.exists():
+            temporary_path.unlink()
+        descriptor = os.open(
+            temporary_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600
+        )
+        with os.fdopen(descriptor, "w", encoding="utf-8") as cache_file:
+            cache_file.write(dumps({"pages": pages}))
+        os.replace(temporary_path, cache_path)
+    except OSError:
+        pass
+
+
+def create_filter(visibility, languages, date_arguments):
+    """Create a Filter from the arguments passed to the CLI."""
+    if date_arguments is None:
+        date_range = None
     else:
-        gist_ids = filter_gists(relevant_args, gists)
-        delete_gists(args, gist_ids)
+        dates = parse_date_arguments(date_arguments)
+        # A single date is treated as a range starting and ending on that date.
+        date_range = (dates[0], dates[-1])
+    return Filter(visibility, frozenset(languages) if languages else None, date_range)
 
 
 def parse_date_arguments(date_arguments):
-    """Create a list of datetime objects from the arguments passed to the
+    """Create a list of date objects from the arguments passed to the
     CLI's -dr option."""
     if len(date_arguments) == 3:
         raise TypeError(
@@ -123,8 +429,7 @@ def parse_date_arguments(date_arguments):
     dates = []
     for argument in date_arguments:
         try:
-            date = datetime.strptime(argument, "%Y-%m-%d").date()
-            dates.append(date)
+            dates.append(date.fromisoformat(argument))
         except ValueError as error:
             raise ValueError(
                 "Please pass a date in YYYY-MM-DD format to the -dr argument."
@@ -133,63 +438,49 @@ def parse_date_arguments(date_arguments):
 
 
 def create_gists(json):
-    """Create Gists."""
-    gists = []
+    """Create Gists, one at a time."""
+    parse_date = date.fromisoformat  # Avoid a global lookup per gist.
     for raw_gist in json:
-        if (
-            languages := raw_gist["files"][next(iter(raw_gist["files"]))]["language"]
-        ) is None:
-            languages = "Unknown"
-        visibility = raw_gist.get("public")
-        date_created = datetime.strptime(
-            raw_gist["created_at"], "%Y-%m-%dT%H:%M:%SZ"  # ISO 8601 format.
-        ).date()
-        if visibility:
-            visibility = "public"
+        first_file = next(iter(raw_gist["files"].values()))
+        language = first_file.get("language") or "Unknown"
+        visibility = "public" if raw_gist.get("public") else "secret"
+        date_created = parse_date(raw_gist["created_at"][:10])  # ISO 8601 format.
+
+        yield Gist(raw_gist.get("id"), visibility, language, date_created)
+
+
+def create_gists_from_graphql(nodes):
+    """Create Gists from the nodes returned by the GraphQL API, one at a
+    time."""
+    for node in nodes:
+        # The REST API orders files by name and language is taken from the
+        # first one, so do the same here.
+        first_file = min(node["files"], key=lambda file: file["name"])
+        if first_file["language"] is None:
+            language = "Unknown"
         else:
-            visibility = "secret"
+            language = first_file["language"]["name"]
+        visibility = "public" if node["isPublic"] else "secret"
+        date_created = date.fromisoformat(node["createdAt"][:10])  # ISO 8601 format.
 
-        gist = Gist(raw_gist.get("id"), visibility, languages, date_created)
-        gists.append(gist)
-    return gists
+        yield Gist(node["name"], visibility, language, date_created)
 
 
-def filter_gists(relevant_args, gists):
+def filter_gists(gist_filter, gists):
     """Filter the gists to those that match the CLI arguments."""
-    gist_ids = []
-    for index, argument in enumerate(relevant_args):
-        matched_ids = []
-        for gist in gists:
-            if (
-                argument is None
-            ):  # All Gists eligible if there is no argument for this option.
-                matched_ids.append(gist.id)
-                continue
-            # Visiblity.
-            if index == 0 and argument == gist.visibility:
-                matched_ids.append(gist.id)
-            # Languages.
-            if index == 1 and isinstance(argument, list):
-                if gist.language in argument:
-                    matched_ids.append(gist.id)
-            # Date range
-            if index == 2 and isinstance(argument, list):
-                if len(argument) == 1:
-                    if gist.created_date == argument[0]:
-                        matched_ids.append(gist.id)
-                else:
-                    if (
-                        gist.created_date >= argument[0]
-                        and gist.created_date <= argument[1]
-                    ):
-                        matched_ids.append(gist.id)
-        gist_ids.append(matched_ids)
-
-    gist_ids = set(gist_ids[0]).intersection(*gist_ids[1:])
-    return list(gist_ids)
-
-
-def delete_gists(args, gists):
+    visibility = gist_filter.visibility
+    languages = gist_filter.languages
+    start_date, end_date = gist_filter.date_range or (None, None)
+    return [
+        gist.id
+        for gist in gists
+        if (visibility is None or gist.visibility == visibility)
+        and (languages is None or gist.language in languages)
+        and (start_date is None or start_date <= gist.created_date <= end_date)
+    ]
+
+
+def delete_gists(args, gists, session):
     """Delete Github gists."""
     if len(gists) == 0:
         print("No gists are eligible for deletion.")
@@ -202,20 +493,36 @@ def delete_gists(args, gists):
             f"""[bold yellow]{len(gists)}[/bold yellow] [bold red]gists will be deleted.[/bold red]"""
         )
         answer = input("[Y/n] ")
-        if answer not in ("Yes", "Y", "y"):
+        if answer.strip().lower() not in CONFIRMATION_ANSWERS:
             return
     with alive_bar(len(gists)) as progress_bar:
         progress_bar.title("Deleting gists...")
-        for gist in gists:
-            sleep(1)
-            response = requests.delete(
-                f"https://api.github.com/gists/{gist}",
-                headers={
-                    "Accept": "application/vnd.github+json",
-                    "Authorization": f"Bearer {args.token}",
-                    "X-GitHub-Api-Version": "2022-11-28",
-                },
-            )
-        response.raise_for_status()
-        progress_bar()
+        rate_limiter = RateLimiter(SECONDS_BETWEEN_DELETES)
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_DELETES) as executor:
+            futures = [
+                executor.submit(delete_gist, session, gist, rate_limiter)
+                for gist in gists
+            ]
+            try:
+                for future in as_completed(futures):
+                    future.result()
+                    progress_bar()
+            except Exception:
+                # Don't send any more requests once one has failed.
+                for future in futures:
+                    future.cancel()
+                raise
     rich.print("[bold red]Gists have been deleted![/bold red]")
+
+
+def delete_gist(session, gist_id, rate_limiter):
+    """Delete a single Github gist."""
+    # Retries go through the rate limiter too, so workers that waited out a
+    # rate limit together don't all send their deletes at once.
+    response = send_request(
+        session,
+        "DELETE",
+        f"https://api.github.com/gists/{gist_id}",
+        before_request=rate_limiter.wait,
+    )
+    response.raise_for_status()
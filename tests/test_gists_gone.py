@@ -2,6 +2,7 @@
 Unit tests for gists_gone.py
 """
 
+from argparse import Namespace
 from datetime import datetime
 import json
 from pathlib import Path
@@ -13,15 +14,50 @@ from requests import HTTPError
 
 from gists_gone.gists_gone import (
     cli,
+    create_filter,
+    create_session,
+    send_request,
+    fetch_gists,
+    fetch_gists_graphql,
+    fetch_gists_rest,
+    get_cache_path,
     parse_date_arguments,
     create_gists,
+    create_gists_from_graphql,
     filter_gists,
+    Filter,
+    SECONDS_BETWEEN_DELETES,
+    SECONDARY_RATE_LIMIT_WAIT,
     delete_gists,
     Gist,
 )
 
+EMPTY_GRAPHQL_PAGE = {
+    "data": {
+        "viewer": {
+            "gists": {
+                "nodes": [],
+                "pageInfo": {"endCursor": None, "hasNextPage": False},
+            }
+        }
+    }
+}
+
 
 # Fixtures.
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """Keep the tests from reading or writing the user's cache."""
+    path = tmp_path / "gists-gone"
+    monkeypatch.setattr("gists_gone.gists_gone.CACHE_DIR", path)
+    return path
+
+
+@pytest.fixture
+def cache_path(cache_dir):
+    return get_cache_path(create_session("123"))
+
+
 @pytest.fixture
 def mock_gists():
     with open(
@@ -31,9 +67,18 @@ def mock_gists():
     return gists
 
 
+@pytest.fixture
+def mock_graphql_pages():
+    with open(
+        Path("./tests/fixtures/fake_gists_graphql.json"), "r", encoding="utf-8"
+    ) as json_input:
+        pages = json.load(json_input)
+    return pages
+
+
 @pytest.fixture
 def created_gists(mock_gists):
-    gists = create_gists(mock_gists)
+    gists = list(create_gists(mock_gists))
     return gists
 
 
@@ -56,7 +101,10 @@ def test_invalid_api_key(cli_args, requests_mock):
     """Test an exception is raised when an invalid API token is provided
     to the CLI.
     """
-    cli_args.return_value = Mock(token=None)
+    cli_args.return_value = Namespace(
+        token=None, force=False, visibility=None, languages=None, date_range=None
+    )
+    requests_mock.post("https://api.github.com/graphql", status_code=401)
     requests_mock.get("https://api.github.com/gists", status_code=403)
 
     with pytest.raises(HTTPError):
@@ -74,8 +122,8 @@ def test_no_filtering(mock_delete, mock_filter, gists, requests_mock):
     Notes
     -----
     Unit testing this method requires swapping out the Mock object
-    for a custom class, as calling vars() on a Mock returns attributes
-    not present in the object I'm trying to mock.
+    for a custom class, as options that weren't passed to the CLI need to be
+    None rather than Mock attributes.
 
     Note that this is also why I have used the patch decorator in the body of
     this unit test, as I needed to define swap out the mock for a custom class
@@ -97,7 +145,9 @@ def test_no_filtering(mock_delete, mock_filter, gists, requests_mock):
             self.languages = languages
             self.date_range = date_range
 
-    requests_mock.get("https://api.github.com/gists", status_code=200, json={})
+    requests_mock.post(
+        "https://api.github.com/graphql", status_code=200, json=EMPTY_GRAPHQL_PAGE
+    )
     with patch("gists_gone.gists_gone.get_parser_args", Arguments):
         cli()
         mock_filter.assert_not_called()
@@ -135,7 +185,9 @@ def test_filtering_is_called(mock_delete, mock_filter, gists, requests_mock):
                 self.languages = languages
             self.date_range = date_range
 
-    requests_mock.get("https://api.github.com/gists", status_code=200, json={})
+    requests_mock.post(
+        "https://api.github.com/graphql", status_code=200, json=EMPTY_GRAPHQL_PAGE
+    )
     with patch("gists_gone.gists_gone.get_parser_args", Arguments):
         cli()
         mock_filter.assert_called()
@@ -143,6 +195,188 @@ def test_filtering_is_called(mock_delete, mock_filter, gists, requests_mock):
 
 
 # Test functions.
+def test_create_session_sends_auth_headers(requests_mock):
+    """Test that requests made with the session are authenticated."""
+    requests_mock.get("https://api.github.com/gists", status_code=200, json=[])
+    create_session("123").get("https://api.github.com/gists")
+    headers = requests_mock.last_request.headers
+    assert headers["Authorization"] == "Bearer 123"
+    assert headers["Accept"] == "application/vnd.github+json"
+    assert headers["X-GitHub-Api-Version"] == "2022-11-28"
+
+
+@patch("gists_gone.gists_gone.sleep")
+def test_send_request_retries_after_secondary_rate_limit(sleep, requests_mock):
+    """Test that a request hitting a secondary rate limit is retried after
+    the time given in the Retry-After header."""
+    requests_mock.get(
+        "https://api.github.com/gists",
+        [
+            {"status_code": 403, "headers": {"Retry-After": "30"}},
+            {"status_code": 200, "json": []},
+        ],
+    )
+    response = send_request(
+        create_session("123"), "GET", "https://api.github.com/gists"
+    )
+    assert response.status_code == 200
+    assert requests_mock.call_count == 2
+    sleep.assert_called_once_with(30)
+
+
+@patch("gists_gone.gists_gone.sleep")
+def test_send_request_retries_secondary_rate_limit_without_headers(
+    sleep, requests_mock
+):
+    """Test that a secondary rate limit response without a Retry-After header
+    is retried after waiting SECONDARY_RATE_LIMIT_WAIT seconds."""
+    requests_mock.delete(
+        "https://api.github.com/gists/abc",
+        [
+            {
+                "status_code": 403,
+                "json": {
+                    "message": "You have exceeded a secondary rate limit. "
+                    "Please wait a few minutes before you try again."
+                },
+            },
+            {"status_code": 204},
+        ],
+    )
+    response = send_request(
+        create_session("123"), "DELETE", "https://api.github.com/gists/abc"
+    )
+    assert response.status_code == 204
+    assert requests_mock.call_count == 2
+    sleep.assert_called_once_with(SECONDARY_RATE_LIMIT_WAIT)
+
+
+@patch("gists_gone.gists_gone.sleep")
+def test_send_request_does_not_retry_other_forbidden_responses(sleep, requests_mock):
+    """Test that a 403 that isn't from a rate limit is returned straight away."""
+    requests_mock.delete(
+        "https://api.github.com/gists/abc",
+        status_code=403,
+        json={"message": "Must have admin rights to Repository."},
+    )
+    response = send_request(
+        create_session("123"), "DELETE", "https://api.github.com/gists/abc"
+    )
+    assert response.status_code == 403
+    assert requests_mock.call_count == 1
+    sleep.assert_not_called()
+
+
+@patch("gists_gone.gists_gone.sleep")
+def test_send_request_gives_up_when_rate_limited(sleep, requests_mock):
+    """Test that a request that keeps hitting a rate limit eventually returns
+    the failed response."""
+    requests_mock.get(
+        "https://api.github.com/gists",
+        status_code=429,
+        headers={"Retry-After": "1"},
+    )
+    response = send_request(
+        create_session("123"), "GET", "https://api.github.com/gists"
+    )
+    with pytest.raises(HTTPError):
+        response.raise_for_status()
+
+
+@patch("gists_gone.gists_gone.time")
+@patch("gists_gone.gists_gone.sleep")
+def test_send_request_waits_when_rate_limit_is_low(sleep, mock_time, requests_mock):
+    """Test that the primary rate limit is waited out once it's nearly used up,
+    and that no time is wasted waiting otherwise."""
+    mock_time.return_value = 1000
+    requests_mock.get(
+        "https://api.github.com/gists",
+        [
+            {"json": [], "headers": {"X-RateLimit-Remaining": "4999"}},
+            {
+                "json": [],
+                "headers": {
+                    "X-RateLimit-Remaining": "5",
+                    "X-RateLimit-Reset": "1060",
+                },
+            },
+        ],
+    )
+    session = create_session("123")
+    send_request(session, "GET", "https://api.github.com/gists")
+    sleep.assert_not_called()
+    send_request(session, "GET", "https://api.github.com/gists")
+    sleep.assert_called_once_with(60)
+
+
+def test_fetch_gists_rest_stops_at_last_page(requests_mock, mock_gists):
+    """Test that fetch_gists_rest() stops requesting pages once a page has
+    fewer than 100 gists, or is empty."""
+    requests_mock.get("https://api.github.com/gists", json=mock_gists)
+    gists = list(fetch_gists_rest(create_session("123")))
+    assert len(gists) == len(mock_gists)
+    assert requests_mock.call_count == 1
+
+    full_page = [dict(mock_gists[0], id=str(number)) for number in range(100)]
+    requests_mock.get(
+        "https://api.github.com/gists", [{"json": full_page}, {"json": []}]
+    )
+    requests_mock.reset_mock()
+    gists = list(fetch_gists_rest(create_session("123")))
+    assert len(gists) == 100
+    assert requests_mock.call_count == 2
+    assert requests_mock.request_history[1].qs["page"] == ["2"]
+
+
+def test_fetch_gists_rest_reuses_unmodified_cached_pages(
+    requests_mock, mock_gists, created_gists, cache_path
+):
+    """Test that pages Github reports as not modified are read from the
+    cache."""
+    requests_mock.get(
+        "https://api.github.com/gists",
+        [
+            {"json": mock_gists, "headers": {"ETag": '"abc123"'}},
+            {"status_code": 304, "headers": {"ETag": '"abc123"'}},
+        ],
+    )
+    assert list(fetch_gists_rest(create_session("123"))) == created_gists
+    assert "If-None-Match" not in requests_mock.request_history[0].headers
+    assert cache_path.exists()
+
+    assert list(fetch_gists_rest(create_session("123"))) == created_gists
+    assert requests_mock.request_history[1].headers["If-None-Match"] == '"abc123"'
+
+
+def test_fetch_gists_rest_ignores_unreadable_cache(
+    requests_mock, mock_gists, created_gists, cache_path
+):
+    """Test that a corrupt cache is ignored rather than raising an error."""
+    cache_path.parent.mkdir()
+    cache_path.write_text("{not json", encoding="utf-8")
+    requests_mock.get("https://api.github.com/gists", json=mock_gists)
+    assert list(fetch_gists_rest(create_session("123"))) == created_gists
+    assert "If-None-Match" not in requests_mock.last_request.headers
+
+
+def test_cache_is_private_to_the_user(requests_mock, mock_gists, cache_path):
+    """Test that the cache, which holds the ids of secret gists, can only be
+    read by the user."""
+    requests_mock.get(
+        "https://api.github.com/gists", json=mock_gists, headers={"ETag": '"abc"'}
+    )
+    list(fetch_gists_rest(create_session("123")))
+    assert cache_path.stat().st_mode & 0o777 == 0o600
+    assert cache_path.parent.stat().st_mode & 0o777 == 0o700
+
+
+def test_cache_is_separate_for_each_token(cache_dir):
+    """Test that different tokens don't share a cache."""
+    path = get_cache_path(create_session("123"))
+    assert path != get_cache_path(create_session("456"))
+    assert path.parent == cache_dir
+
+
 def test_parse_date_arguments():
     """Test that the test_parse_date_arguments works."""
     # Test that too many arguments raises an error.
@@ -169,12 +403,11 @@ def test_parse_date_arguments():
 @patch("gists_gone.gists_gone.get_parser_args")
 @patch.dict("gists_gone.gists_gone.environ", {"GITHUB_API_TOKEN": "123"})
 def test_create_gists_works(cli_args, requests_mock, mock_gists):
-    """Test that Gists named tuples are succesfully created from the JSON
+    """Test that Gists are succesfully created from the JSON
     returned from the Github API."""
     requests_mock.get("https://api.github.com/gists", status_code=200)
-    gists = create_gists(mock_gists)
+    gists = list(create_gists(mock_gists))
 
-    assert isinstance(gists, list)
     assert gists[0] == Gist(
         "7fea2e3837f324e5e3699917f687c862",
         "secret",
@@ -189,24 +422,119 @@ def test_create_gists_works(cli_args, requests_mock, mock_gists):
     )
 
 
+def test_create_gists_from_graphql_matches_rest(mock_graphql_pages, created_gists):
+    """Test that the GraphQL API nodes produce the same Gists as the REST
+    API JSON."""
+    nodes = [
+        node
+        for page in mock_graphql_pages
+        for node in page["data"]["viewer"]["gists"]["nodes"]
+    ]
+    assert list(create_gists_from_graphql(nodes)) == created_gists
+
+
+def test_fetch_gists_graphql_follows_cursor(
+    requests_mock, mock_graphql_pages, created_gists
+):
+    """Test that fetch_gists_graphql() keeps requesting pages until there
+    are no more."""
+    requests_mock.post(
+        "https://api.github.com/graphql",
+        [{"json": page} for page in mock_graphql_pages],
+    )
+    gists = list(fetch_gists_graphql(create_session("123")))
+    assert gists == created_gists
+    assert requests_mock.call_count == 2
+    assert requests_mock.request_history[0].json()["variables"] == {"cursor": None}
+    assert requests_mock.request_history[1].json()["variables"] == {
+        "cursor": "Y3Vyc29yOjQ="
+    }
+
+
+def test_fetch_gists_falls_back_to_rest(requests_mock, mock_gists, created_gists):
+    """Test that fetch_gists() uses the REST API when the GraphQL API
+    returns an error."""
+    requests_mock.post(
+        "https://api.github.com/graphql",
+        json={"errors": [{"message": "Something went wrong."}]},
+    )
+    requests_mock.get("https://api.github.com/gists", json=mock_gists)
+    gists = list(fetch_gists(create_session("123")))
+    assert gists == created_gists
+
+
+def test_fetch_gists_does_not_fall_back_after_first_page(
+    requests_mock, mock_graphql_pages
+):
+    """Test that fetch_gists() raises, rather than starting again with the REST
+    API, if the GraphQL API fails after gists have already been yielded."""
+    requests_mock.post(
+        "https://api.github.com/graphql",
+        [{"json": mock_graphql_pages[0]}, {"status_code": 502}],
+    )
+    requests_mock.get("https://api.github.com/gists", json=[])
+    with pytest.raises(HTTPError):
+        list(fetch_gists(create_session("123")))
+    assert not any(request.method == "GET" for request in requests_mock.request_history)
+
+
+def test_create_filter():
+    """Test that create_filter() turns the CLI arguments into a Filter."""
+    gist_filter = create_filter(None, None, None)
+    assert gist_filter == Filter(None, None, None)
+    assert gist_filter.is_empty()
+
+    gist_filter = create_filter("public", ["Python", "SQL"], ["2024-01-01"])
+    assert gist_filter == Filter(
+        "public",
+        frozenset({"Python", "SQL"}),
+        (datetime(2024, 1, 1).date(), datetime(2024, 1, 1).date()),
+    )
+    assert not gist_filter.is_empty()
+
+    gist_filter = create_filter(None, None, ["2024-01-01", "2024-02-01"])
+    assert gist_filter.date_range == (
+        datetime(2024, 1, 1).date(),
+        datetime(2024, 2, 1).date(),
+    )
+
+
 def test_filter_gists_returns_list(created_gists):
     """Test that filter_gists() returns a list."""
-    arguments = [None, ["Python"], None]
-    gist_ids = filter_gists(arguments, created_gists)
+    gist_filter = create_filter(None, ["Python"], None)
+    gist_ids = filter_gists(gist_filter, created_gists)
     assert isinstance(gist_ids, list)
 
 
+def test_filter_gists_works_with_streamed_gists(created_gists):
+    """Test that filter_gists() accepts gists as they are streamed in, without
+    them being collected into a list first."""
+    gist_filter = create_filter("public", ["Python", "SQL"], None)
+    gist_ids = filter_gists(gist_filter, (gist for gist in created_gists))
+    assert gist_ids == filter_gists(gist_filter, created_gists)
+
+
+def test_filter_gists_keeps_gist_order(created_gists):
+    """Test that filter_gists() returns each matching gist once, in the order
+    the gists were passed."""
+    gist_filter = create_filter("public", None, None)
+    gist_ids = filter_gists(gist_filter, created_gists)
+    assert gist_ids == [
+        gist.id for gist in created_gists if gist.visibility == "public"
+    ]
+
+
 def test_filter_gists_works_with_visibility(created_gists):
     """Test that filter_gists() works when the visibility argument is passed."""
 
-    arguments = ["secret", None, None]
-    gist_ids = filter_gists(arguments, created_gists)
+    gist_filter = create_filter("secret", None, None)
+    gist_ids = filter_gists(gist_filter, created_gists)
     assert "7fea2e3837f324e5e3699917f687c862" in gist_ids
     assert "5f6258f9caae6f2c6511e926f7f623af" in gist_ids
     assert len(gist_ids) == 2
 
-    arguments = ["public", None, None]
-    gist_ids = filter_gists(arguments, created_gists)
+    gist_filter = create_filter("public", None, None)
+    gist_ids = filter_gists(gist_filter, created_gists)
     assert "7fea2e3837f324e5e3699917f687c862" not in gist_ids
     assert "5f6258f9caae6f2c6511e926f7f623af" not in gist_ids
     assert len(gist_ids) == 4
@@ -216,21 +544,21 @@ def test_filter_gists_works_with_languages(created_gists):
     """Test that filter_gists() works when a languages argument is passed."""
 
     # One language passed to --languages.
-    arguments = [None, ["Python"], None]
-    gist_ids = filter_gists(arguments, created_gists)
+    gist_filter = create_filter(None, ["Python"], None)
+    gist_ids = filter_gists(gist_filter, created_gists)
     assert "68ae668e6b5e7364f44b62dd7062231f" in gist_ids
     assert len(gist_ids) == 1
 
     # Multiple language passed to --languages.
-    arguments = [None, ["Python", "SQL"], None]
-    gist_ids = filter_gists(arguments, created_gists)
+    gist_filter = create_filter(None, ["Python", "SQL"], None)
+    gist_ids = filter_gists(gist_filter, created_gists)
     assert "68ae668e6b5e7364f44b62dd7062231f" in gist_ids
     assert "bc22d164463296d99cbeb1a7038b6d6e" in gist_ids
     assert len(gist_ids) == 2
 
     # Multiple arguments passed to --languages, only one of which is valid.
-    arguments = [None, ["Python", "Spam"], None]
-    gist_ids = filter_gists(arguments, created_gists)
+    gist_filter = create_filter(None, ["Python", "Spam"], None)
+    gist_ids = filter_gists(gist_filter, created_gists)
     assert "68ae668e6b5e7364f44b62dd7062231f" in gist_ids
     assert len(gist_ids) == 1
 
@@ -239,115 +567,199 @@ def test_filter_works_with_dates(created_gists):
     """Test that filter_gists() works with arguments passed to -dr."""
 
     # Test Gist creation date equal to date passed to argument.
-    arguments = [None, None, ["2024-06-16"]]
-    arguments[2] = parse_date_arguments(arguments[2])
-    gist_ids = filter_gists(arguments, created_gists)
+    gist_filter = create_filter(None, None, ["2024-06-16"])
+    gist_ids = filter_gists(gist_filter, created_gists)
     assert len(gist_ids) == 3
     assert "8eaee095f4b3a822127cc4fa368b4165" in gist_ids
     assert "bc22d164463296d99cbeb1a7038b6d6e" in gist_ids
     assert "68ae668e6b5e7364f44b62dd7062231f" in gist_ids
 
     # Test Gist created within date ranges.
-    arguments = [None, None, ["2024-07-11", "2024-08-01"]]
-    arguments[2] = parse_date_arguments(arguments[2])
-    gist_ids = filter_gists(arguments, created_gists)
+    gist_filter = create_filter(None, None, ["2024-07-11", "2024-08-01"])
+    gist_ids = filter_gists(gist_filter, created_gists)
     assert len(gist_ids) == 2
 
-    arguments = [None, None, ["2021-01-01", "2023-01-01"]]
-    arguments[2] = parse_date_arguments(arguments[2])
-    gist_ids = filter_gists(arguments, created_gists)
+    gist_filter = create_filter(None, None, ["2021-01-01", "2023-01-01"])
+    gist_ids = filter_gists(gist_filter, created_gists)
     assert len(gist_ids) == 0
 
-    arguments = [None, None, ["2025-01-01", "2030-01-01"]]
-    arguments[2] = parse_date_arguments(arguments[2])
-    gist_ids = filter_gists(arguments, created_gists)
+    gist_filter = create_filter(None, None, ["2025-01-01", "2030-01-01"])
+    gist_ids = filter_gists(gist_filter, created_gists)
     assert len(gist_ids) == 0
 
 
 def test_filter_works_with_multiple_arguments(created_gists):
     """Test that filter_gists works when different arguments are passed."""
 
-    arguments = ["secret", ["Python"], None]
-    gist_ids = filter_gists(arguments, created_gists)
+    gist_filter = create_filter("secret", ["Python"], None)
+    gist_ids = filter_gists(gist_filter, created_gists)
     assert len(gist_ids) == 0
 
-    arguments = ["public", ["Python"], None]
-    gist_ids = filter_gists(arguments, created_gists)
+    gist_filter = create_filter("public", ["Python"], None)
+    gist_ids = filter_gists(gist_filter, created_gists)
     assert "68ae668e6b5e7364f44b62dd7062231f" in gist_ids
     assert len(gist_ids) == 1
 
-    arguments = ["public", ["Python", "Ruby"], None]
-    gist_ids = filter_gists(arguments, created_gists)
+    gist_filter = create_filter("public", ["Python", "Ruby"], None)
+    gist_ids = filter_gists(gist_filter, created_gists)
     assert "68ae668e6b5e7364f44b62dd7062231f" in gist_ids
     assert "8eaee095f4b3a822127cc4fa368b4165" in gist_ids
     assert len(gist_ids) == 2
 
-    arguments = ["secret", None, ["2024-07-12"]]
-    arguments[2] = parse_date_arguments(arguments[2])
-    gist_ids = filter_gists(arguments, created_gists)
+    gist_filter = create_filter("secret", None, ["2024-07-12"])
+    gist_ids = filter_gists(gist_filter, created_gists)
     assert len(gist_ids) == 2
 
-    arguments = ["public", ["Rust", "Clojure"], ["2024-07-12"]]
-    arguments[2] = parse_date_arguments(arguments[2])
-    gist_ids = filter_gists(arguments, created_gists)
+    gist_filter = create_filter("public", ["Rust", "Clojure"], ["2024-07-12"])
+    gist_ids = filter_gists(gist_filter, created_gists)
     assert len(gist_ids) == 0
 
-    arguments = ["secret", ["Rust", "Clojure"], ["2024-07-12"]]
-    arguments[2] = parse_date_arguments(arguments[2])
-    gist_ids = filter_gists(arguments, created_gists)
+    gist_filter = create_filter("secret", ["Rust", "Clojure"], ["2024-07-12"])
+    gist_ids = filter_gists(gist_filter, created_gists)
     assert len(gist_ids) == 2
 
-    arguments = ["public", None, ["2024-04-01", "2024-06-28"]]
-    arguments[2] = parse_date_arguments(arguments[2])
-    gist_ids = filter_gists(arguments, created_gists)
+    gist_filter = create_filter("public", None, ["2024-04-01", "2024-06-28"])
+    gist_ids = filter_gists(gist_filter, created_gists)
     assert len(gist_ids) == 3
 
-    arguments = ["public", ["Ruby"], ["2024-04-01", "2024-06-28"]]
-    arguments[2] = parse_date_arguments(arguments[2])
-    gist_ids = filter_gists(arguments, created_gists)
+    gist_filter = create_filter("public", ["Ruby"], ["2024-04-01", "2024-06-28"])
+    gist_ids = filter_gists(gist_filter, created_gists)
     assert len(gist_ids) == 1
     assert "8eaee095f4b3a822127cc4fa368b4165" in gist_ids
 
-    arguments = ["public", ["SQL"], ["2024-01-01", "2024-06-15"]]
-    arguments[2] = parse_date_arguments(arguments[2])
-    gist_ids = filter_gists(arguments, created_gists)
+    gist_filter = create_filter("public", ["SQL"], ["2024-01-01", "2024-06-15"])
+    gist_ids = filter_gists(gist_filter, created_gists)
     assert len(gist_ids) == 0
 
     # Technically filter_gists() should not be called if all arguments are None.
-    arguments = [None, None, None]
-    gist_ids = filter_gists(arguments, created_gists)
+    gist_filter = create_filter(None, None, None)
+    gist_ids = filter_gists(gist_filter, created_gists)
     assert len(gist_ids) == 6
 
 
 @patch("builtins.input")
-@patch("requests.delete")
-def test_force_argument_works(mock_api_call, mock_input, created_gists):
+def test_force_argument_works(mock_input, requests_mock):
     """
     Test that the --force option works with delete_gists.
     """
-    delete_gists(Mock(force=True), created_gists)
+    requests_mock.delete("https://api.github.com/gists/abc", status_code=204)
+    delete_gists(Mock(force=True), ["abc"], create_session("123"))
     mock_input.assert_not_called()
 
 
 @patch("builtins.input")
 @patch("gists_gone.gists_gone.sleep")
-@patch("requests.delete")
-def test_delete_returns_if_users_says_no(mock_api_call, sleep, answer, created_gists):
+def test_delete_returns_if_users_says_no(sleep, answer, created_gists):
     """Test that if a user does not respond with Yes, Y or yes the delete_gists()
     function will exit without doing anything.
     """
     answer.return_value = "No"
-    delete_gists(Mock(force=False), created_gists)
+    session = Mock()
+    delete_gists(Mock(force=False), created_gists, session)
     sleep.assert_not_called()
+    session.request.assert_not_called()
+
+
+@patch("builtins.input")
+def test_delete_accepts_any_case_of_yes(answer, requests_mock):
+    """Test that yes is accepted regardless of case or surrounding whitespace."""
+    requests_mock.delete("https://api.github.com/gists/abc", status_code=204)
+    for reply in ("y", "Y", "yes", "YES", " Yes "):
+        answer.return_value = reply
+        requests_mock.reset_mock()
+        delete_gists(Mock(force=False), ["abc"], create_session("123"))
+        assert requests_mock.call_count == 1
 
 
 @patch("builtins.input")
 @patch("gists_gone.gists_gone.sleep")
-@patch("requests.delete")
-def test_delete_does_not_run_with_no_gists(mock_api_call, sleep, mock_input):
+def test_delete_does_not_run_with_no_gists(sleep, mock_input):
     """
     Test that if no gists have been passed to delete_gists() nothing happens.
     """
+    session = Mock()
+    delete_gists(Mock(force=False), {}, session)
     mock_input.assert_not_called()
     sleep.assert_not_called()
-    delete_gists(Mock(force=False), {})
+    session.request.assert_not_called()
+
+
+@patch("gists_gone.gists_gone.sleep")
+def test_delete_gists_deletes_every_gist(sleep, requests_mock, created_gists):
+    """Test that delete_gists() sends a DELETE request for every gist."""
+    for gist in created_gists:
+        requests_mock.delete(f"https://api.github.com/gists/{gist.id}", status_code=204)
+    delete_gists(
+        Mock(force=True),
+        [gist.id for gist in created_gists],
+        create_session("123"),
+    )
+    assert requests_mock.call_count == len(created_gists)
+    assert {request.url for request in requests_mock.request_history} == {
+        f"https://api.github.com/gists/{gist.id}" for gist in created_gists
+    }
+
+
+@patch("gists_gone.gists_gone.sleep")
+@patch("gists_gone.gists_gone.alive_bar")
+def test_delete_gists_advances_progress_bar_per_gist(
+    mock_alive_bar, sleep, requests_mock
+):
+    """Test that the progress bar is advanced once for every deleted gist."""
+    gist_ids = [str(number) for number in range(25)]
+    for gist_id in gist_ids:
+        requests_mock.delete(f"https://api.github.com/gists/{gist_id}", status_code=204)
+    delete_gists(Mock(force=True), gist_ids, create_session("123"))
+    progress_bar = mock_alive_bar.return_value.__enter__.return_value
+    assert progress_bar.call_count == 25
+    assert all(call.args == () for call in progress_bar.call_args_list)
+
+
+@patch("gists_gone.gists_gone.time")
+@patch("gists_gone.gists_gone.sleep")
+def test_delete_gists_spaces_out_deletions(sleep, mock_time, requests_mock):
+    """Test that the deletions sent by the worker threads are spaced out by
+    SECONDS_BETWEEN_DELETES, rather than all being sent at once."""
+    mock_time.return_value = 1000
+    gist_ids = [str(number) for number in range(4)]
+    for gist_id in gist_ids:
+        requests_mock.delete(f"https://api.github.com/gists/{gist_id}", status_code=204)
+    delete_gists(Mock(force=True), gist_ids, create_session("123"))
+    waits = sorted(call.args[0] for call in sleep.call_args_list)
+    assert waits == [
+        SECONDS_BETWEEN_DELETES * number for number in range(1, len(gist_ids))
+    ]
+
+
+@patch("gists_gone.gists_gone.time")
+@patch("gists_gone.gists_gone.sleep")
+def test_delete_gists_spaces_out_retried_deletions(sleep, mock_time, requests_mock):
+    """Test that deletions retried after a secondary rate limit are still
+    spaced out by SECONDS_BETWEEN_DELETES, rather than sent together."""
+    mock_time.return_value = 1000
+    gist_ids = ["abc", "def"]
+    for gist_id in gist_ids:
+        requests_mock.delete(
+            f"https://api.github.com/gists/{gist_id}",
+            [
+                {
+                    "status_code": 403,
+                    "json": {"message": "You have exceeded a secondary rate limit."},
+                },
+                {"status_code": 204},
+            ],
+        )
+    delete_gists(Mock(force=True), gist_ids, create_session("123"))
+    assert requests_mock.call_count == 4
+    waits = [call.args[0] for call in sleep.call_args_list]
+    assert waits.count(SECONDARY_RATE_LIMIT_WAIT) == 2
+    spacing_waits = sorted(wait for wait in waits if wait != SECONDARY_RATE_LIMIT_WAIT)
+    # One wait before the second first attempt, then one before each retry.
+    assert spacing_waits == [SECONDS_BETWEEN_DELETES * number for number in range(1, 4)]
+
+
+def test_delete_gists_raises_on_failed_deletion(requests_mock):
+    """Test that an exception is raised when Github fails to delete a gist."""
+    requests_mock.delete("https://api.github.com/gists/abc", status_code=404)
+    with pytest.raises(HTTPError):
+        delete_gists(Mock(force=True), ["abc"], create_session("123"))